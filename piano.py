@@ -6,11 +6,20 @@ import pygame
 import sys
 import os
 import re
+import threading
 import numpy as np
 import subprocess
-
+import glob
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Mono 22.05kHz is plenty for UI playback and keeps the 88 tones small.
+# pre_init must run before pygame.init(), which would otherwise open the mixer with defaults.
+SAMPLE_RATE = 22050
+pygame.mixer.pre_init(frequency=SAMPLE_RATE, size=-16, channels=1, buffer=256, allowedchanges=0)
 pygame.init()
-pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
 
 # Screen/layout
 WHITE = (255, 255, 255)
@@ -32,98 +41,197 @@ clock = pygame.time.Clock()
 # Sounds - Generate piano-like tones procedurally
 KEY_SOUNDS = {}
 
-def generate_piano_tone(midi_note, duration=3.0, sample_rate=44100):
-    """Generate a realistic piano-like tone with rich harmonics and natural decay"""
-    freq = 440.0 * (2.0 ** ((midi_note - 69) / 12.0))
-    
-    # Generate time array
-    samples = int(duration * sample_rate)
-    t = np.linspace(0, duration, samples, False)
-    
-    # Rich harmonic series with inharmonicity (like real piano strings)
-    # Lower notes have more prominent harmonics
-    harmonic_strength = 1.0 + (69 - midi_note) / 88.0  # Bass notes richer
-    
-    wave = np.sin(2 * np.pi * freq * t)  # Fundamental
-    wave += 0.6 * np.sin(2 * np.pi * freq * 2.01 * t)  # 2nd harmonic (slight inharmonicity)
-    wave += 0.4 * np.sin(2 * np.pi * freq * 3.02 * t)  # 3rd
-    wave += 0.25 * np.sin(2 * np.pi * freq * 4.03 * t)  # 4th
-    wave += 0.15 * np.sin(2 * np.pi * freq * 5.04 * t)  # 5th
-    wave += 0.1 * np.sin(2 * np.pi * freq * 6.05 * t)   # 6th
-    wave += 0.08 * np.sin(2 * np.pi * freq * 7.06 * t)  # 7th
-    wave += 0.06 * np.sin(2 * np.pi * freq * 8.07 * t)  # 8th
-    wave += 0.04 * np.sin(2 * np.pi * freq * 9.08 * t)  # 9th
-    wave += 0.03 * np.sin(2 * np.pi * freq * 10.09 * t) # 10th
-    wave += 0.02 * np.sin(2 * np.pi * freq * 11.1 * t)  # 11th
-    wave += 0.015 * np.sin(2 * np.pi * freq * 12.11 * t) # 12th
-    
-    # Add subtle metallic timbre for higher notes
-    if midi_note > 60:
-        brightness = (midi_note - 60) / 48.0
-        wave += 0.05 * brightness * np.sin(2 * np.pi * freq * 13.12 * t)
-        wave += 0.03 * brightness * np.sin(2 * np.pi * freq * 15.14 * t)
-    
-    # Natural piano envelope - varies by register
+# Rich harmonic series with inharmonicity (like real piano strings).
+# The last two partials add a subtle metallic timbre and are only used above C4.
+HARMONIC_RATIOS = np.array([
+    1.0, 2.01, 3.02, 4.03, 5.04, 6.05,
+    7.06, 8.07, 9.08, 10.09, 11.1, 12.11,
+    13.12, 15.14,
+], dtype=np.float32)
+HARMONIC_AMPS = np.array([
+    1.0, 0.6, 0.4, 0.25, 0.15, 0.1,
+    0.08, 0.06, 0.04, 0.03, 0.02, 0.015,
+    0.05, 0.03,
+], dtype=np.float32)
+BRIGHT_HARMONICS = 2  # trailing entries scaled by note brightness
+
+# Shared time base for every key (float32 throughout to halve memory traffic)
+TONE_DURATION = 2.0
+_T = np.linspace(0, TONE_DURATION, int(TONE_DURATION * SAMPLE_RATE), False, dtype=np.float32)
+_TWO_PI_T = (2 * np.float32(np.pi)) * _T
+
+_RAMP = np.arange(len(_T), dtype=np.float32)  # sample indices for envelope segments
+
+def _envelope_params(midi_note, sample_rate=SAMPLE_RATE):
+    """Return (attack_samples, decay_samples, release_samples, sustain_level) for a note"""
     # Higher notes: faster attack, shorter sustain
     # Lower notes: slower attack, longer sustain
     register_factor = (midi_note - 21) / 87.0  # 0 (bass) to 1 (treble)
-    
+
     attack_time = 0.003 + (1 - register_factor) * 0.015  # 3-18ms
     decay_time = 0.1 + (1 - register_factor) * 0.2       # 100-300ms
     release_time = 0.2 + (1 - register_factor) * 0.8     # 200ms-1s
-    
+
     attack_samples = int(attack_time * sample_rate)
     decay_samples = int(decay_time * sample_rate)
     release_samples = int(release_time * sample_rate)
     sustain_level = 0.4 + (1 - register_factor) * 0.2  # Bass sustains more
-    
-    envelope = np.ones(samples)
-    
+    return attack_samples, decay_samples, release_samples, sustain_level
+
+# Natural piano envelope - varies by register
+ENVELOPE_TABLE = {note: _envelope_params(note) for note in range(START_NOTE, START_NOTE + KEYS)}
+
+def _ramp_into(out, scale):
+    """Write scale * linspace(0, 1, len(out)) into out and return it"""
+    n = len(out)
+    return np.multiply(_RAMP[:n], scale / (n - 1) if n > 1 else 0.0, out=out)
+
+# Per-thread scratch buffers, reused across keys instead of reallocated per note
+_scratch = threading.local()
+
+def _scratch_buffers(samples):
+    """Return this thread's (phase, envelope, wave, partials) float32 buffers"""
+    bufs = getattr(_scratch, 'bufs', None)
+    if bufs is None or len(bufs[0]) != samples:
+        bufs = (
+            np.empty(samples, dtype=np.float32),
+            np.empty(samples, dtype=np.float32),
+            np.empty(samples, dtype=np.float32),
+            np.empty((len(HARMONIC_RATIOS), samples), dtype=np.float32),
+        )
+        _scratch.bufs = bufs
+    return bufs
+
+def render_piano_wave(midi_note, two_pi_t=_TWO_PI_T):
+    """Render a piano-like tone as a (samples,) int16 mono array"""
+    freq = np.float32(440.0 * (2.0 ** ((midi_note - 69) / 12.0)))
+    samples = len(two_pi_t)
+    phase, envelope, wave, partials = _scratch_buffers(samples)
+
+    # Metallic partials fade in above middle C, silent below
+    brightness = max(0.0, (midi_note - 60) / 48.0)
+    amps = HARMONIC_AMPS.copy()
+    amps[-BRIGHT_HARMONICS:] *= np.float32(brightness)
+    # Partials above Nyquist would only alias back as noise
+    amps[freq * HARMONIC_RATIOS >= SAMPLE_RATE / 2] = 0
+
+    # Natural piano envelope, filled segment by segment in place.
+    # Decays use np.exp over a ramp: it is SIMD-vectorized, whereas a
+    # cumprod recurrence (r**i) is serial and measured several times slower.
+    attack_samples, decay_samples, release_samples, sustain_level = ENVELOPE_TABLE[midi_note]
+    envelope.fill(1.0)
+
     # Sharp attack
     if attack_samples > 0:
-        envelope[:attack_samples] = np.linspace(0, 1, attack_samples) ** 0.5  # Slightly curved
-    
+        seg = _ramp_into(envelope[:attack_samples], 1.0)
+        np.sqrt(seg, out=seg)  # Slightly curved
+
     # Exponential decay (more natural)
     if decay_samples > 0 and attack_samples + decay_samples < samples:
-        decay_curve = np.exp(-3 * np.linspace(0, 1, decay_samples))
-        decay_curve = 1 - (1 - sustain_level) * (1 - decay_curve)
-        envelope[attack_samples:attack_samples+decay_samples] = decay_curve
-    
+        seg = _ramp_into(envelope[attack_samples:attack_samples+decay_samples], -3.0)
+        np.exp(seg, out=seg)
+        seg *= 1 - sustain_level
+        seg += sustain_level
+
     # Sustain with slight exponential decay
     sustain_start = attack_samples + decay_samples
     sustain_end = max(sustain_start, samples - release_samples)
     if sustain_end > sustain_start:
-        sustain_samples = sustain_end - sustain_start
-        sustain_decay = np.exp(-0.5 * np.linspace(0, 1, sustain_samples))
-        envelope[sustain_start:sustain_end] = sustain_level * sustain_decay
-    
+        seg = _ramp_into(envelope[sustain_start:sustain_end], -0.5)
+        np.exp(seg, out=seg)
+        seg *= sustain_level
+
     # Smooth release
     if release_samples > 0 and samples >= release_samples:
-        release_curve = np.exp(-4 * np.linspace(0, 1, release_samples))
-        envelope[-release_samples:] = envelope[-release_samples] * release_curve
-    
-    wave = wave * envelope
-    
-    # Normalize with headroom to prevent clipping
-    max_val = np.max(np.abs(wave))
-    if max_val > 0:
-        wave = wave / max_val * 0.8  # 80% of max to avoid distortion
-    
-    # Convert to 16-bit PCM BEFORE stereo processing
-    wave = (wave * 32767).astype(np.int16)
-    
-    # Stereo with slight width (panning effect for realism)
-    pan = 0.5 + (midi_note - 54) / 108.0 * 0.3  # Subtle stereo spread
-    left = (wave.astype(np.float32) * (1 - pan)).astype(np.int16)
-    right = (wave.astype(np.float32) * pan).astype(np.int16)
-    stereo_wave = np.column_stack((left, right))
-    
-    return pygame.sndarray.make_sound(stereo_wave)
+        release_level = envelope[-release_samples]
+        seg = _ramp_into(envelope[-release_samples:], -4.0)
+        np.exp(seg, out=seg)
+        seg *= release_level
+
+    np.multiply(two_pi_t, freq, out=phase)
+
+    # All partials in one sin call, summed with a single matrix-vector product
+    np.multiply(HARMONIC_RATIOS[:, None], phase[None, :], out=partials)
+    np.sin(partials, out=partials)
+    np.matmul(amps, partials, out=wave)
+    wave *= envelope
+
+    # Normalize with headroom to prevent clipping (80% of max to avoid distortion)
+    # and convert to 16-bit PCM in the same pass; this is the only per-note allocation
+    max_val = max(wave.max(), -wave.min())
+    gain = 0.8 * 32767 / max_val if max_val > 0 else 0.0
+    return np.multiply(wave, gain, out=np.empty(samples, dtype=np.int16), casting='unsafe')
+
+def generate_piano_tone(midi_note, two_pi_t=_TWO_PI_T):
+    """Generate a realistic piano-like tone with rich harmonics and natural decay"""
+    return pygame.sndarray.make_sound(render_piano_wave(midi_note, two_pi_t))
+
+# Rendered tones are deterministic, so they are cached next to the script.
+# The file name carries a fingerprint of the synthesis inputs; bump
+# SYNTH_VERSION whenever render_piano_wave's output changes for the same inputs.
+SYNTH_VERSION = 1
+
+def _synth_fingerprint():
+    h = hashlib.sha1()
+    h.update(f"v{SYNTH_VERSION} sr{SAMPLE_RATE} dur{TONE_DURATION}".encode())
+    h.update(HARMONIC_RATIOS.tobytes())
+    h.update(HARMONIC_AMPS.tobytes())
+    h.update(repr(sorted(ENVELOPE_TABLE.items())).encode())
+    return h.hexdigest()[:16]
+
+TONE_CACHE_DIR = os.path.dirname(__file__) if '__file__' in globals() else os.getcwd()
+TONE_CACHE_PATH = os.path.join(TONE_CACHE_DIR, f'piano_tones_{_synth_fingerprint()}.npy')
+
+def _load_tone_cache(path=TONE_CACHE_PATH):
+    """Return cached (KEYS, samples) int16 waves, or None if missing/stale"""
+    if not os.path.exists(path):
+        return None
+    try:
+        waves = np.load(path, mmap_mode='r')
+    except Exception as e:
+        print(f"Tone cache unreadable ({e}); regenerating.")
+        return None
+    if waves.dtype != np.int16 or waves.shape != (KEYS, len(_T)):
+        print("Tone cache does not match current settings; regenerating.")
+        return None
+    return waves
 
-print("Generating high-quality piano sounds for all keys...")
+def _save_tone_cache(waves, path=TONE_CACHE_PATH):
+    try:
+        np.save(path, waves)
+    except Exception as e:
+        print(f"Could not write tone cache {path}: {e}")
+        return
+    # Caches from older synthesis settings can never match again
+    for stale in glob.glob(os.path.join(os.path.dirname(path), 'piano_tones*.npy')):
+        if os.path.abspath(stale) != os.path.abspath(path):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+def _render_all_waves():
+    """Render every key's tone as a (KEYS, samples) int16 array"""
+    notes = range(START_NOTE, START_NOTE + KEYS)
+    global _scratch
+    try:
+        # numpy releases the GIL inside sin/matmul/exp, so threads scale across cores
+        with ThreadPoolExecutor() as ex:
+            return np.stack(list(ex.map(render_piano_wave, notes)))
+    finally:
+        # Rendering is one-off; a fresh local drops every thread's scratch buffers
+        _scratch = threading.local()
+
+waves = _load_tone_cache()
+if waves is not None:
+    print(f"Loading piano sounds from {TONE_CACHE_PATH}")
+else:
+    print("Generating high-quality piano sounds for all keys...")
+    waves = _render_all_waves()
+    _save_tone_cache(waves)
 for i in range(KEYS):
-    note = START_NOTE + i
-    KEY_SOUNDS[note] = generate_piano_tone(note)
+    KEY_SOUNDS[START_NOTE + i] = pygame.sndarray.make_sound(np.ascontiguousarray(waves[i]))
+del waves
 print("Sound generation complete!")
 
 # --- MIDI output (mido preferred, fallback to pygame.midi) ---
@@ -194,53 +302,69 @@ def midi_note_off(note: int, velocity: int = 64):
             pass
 # Input state
 KEYS_PRESSED = set()           # mouse-pressed keys
-PLAYING_SEQ_NOTES = set()      # notes currently playing from sequencer
+_ACTIVE = np.zeros(128, dtype=np.uint8)  # per-note hold count (mouse + sequencer), drives highlighting
+
+def _hold(note):
+    _ACTIVE[note] += 1
+
+def _release(note):
+    if _ACTIVE[note]:
+        _ACTIVE[note] -= 1
 
 # Key rendering helpers
-BLACK_PCS = {1, 3, 6, 8, 10}
+BLACK_PCS = frozenset({1, 3, 6, 8, 10})
 NOTE_NAMES_SHARP = ['C','C#','D','D#','E','F','F#','G','G#','A','A#','B']
+_IS_BLACK = tuple((n % 12) in BLACK_PCS for n in range(128))  # indexed by MIDI note
 
 def is_black_key(midi_note: int) -> bool:
-    return (midi_note % 12) in BLACK_PCS
+    return _IS_BLACK[midi_note]
 
 def midi_to_note_name(midi_note: int) -> str:
     pc = midi_note % 12
     octave = midi_note // 12 - 1
     return f"{NOTE_NAMES_SHARP[pc]}{octave}"
 
-def draw_keyboard(bpm, status_text):
-    # Background
-    screen.fill((20, 20, 20))  # dark background for contrast
-
-    # Keys
-    for i in range(KEYS):
-        note = START_NOTE + i
-        x = i * KEY_WIDTH
-        rect = pygame.Rect(x, 0, KEY_WIDTH, KEY_HEIGHT)
-
-        is_black = is_black_key(note)
-        active = (note in KEYS_PRESSED) or (note in PLAYING_SEQ_NOTES)
-
-        if is_black:
-            base = (10, 10, 10)
-            fill = (40, 40, 80) if active else base  # subtle highlight when active
-            border = (200, 200, 200)
-            text_color = (255, 255, 255)
-        else:
-            base = (245, 245, 245)
-            fill = (180, 220, 255) if active else base  # highlight when active
-            border = (60, 60, 60)
-            text_color = (0, 0, 0)  # black text on white keys
-
-        pygame.draw.rect(screen, fill, rect)
-        pygame.draw.rect(screen, border, rect, 1)
-
-        # Note name label on each key
-        name = midi_to_note_name(note)
-        label = font_small.render(name, True, text_color)
-        screen.blit(label, (x + 4, KEY_HEIGHT - 22))
-
-    # HUD / Legend panel
+_NOTE_NAMES = tuple(midi_to_note_name(n) for n in range(128))  # indexed by MIDI note
+
+def _key_colors(note, active):
+    """Return (fill, border, text_color) for a key"""
+    if _IS_BLACK[note]:
+        base = (10, 10, 10)
+        fill = (40, 40, 80) if active else base  # subtle highlight when active
+        return fill, (200, 200, 200), (255, 255, 255)
+    base = (245, 245, 245)
+    fill = (180, 220, 255) if active else base  # highlight when active
+    return fill, (60, 60, 60), (0, 0, 0)  # black text on white keys
+
+# Note name labels never change, so render them once
+_LABEL_SURFS = {}
+for _note in range(START_NOTE, START_NOTE + KEYS):
+    _LABEL_SURFS[_note] = font_small.render(_NOTE_NAMES[_note], True, _key_colors(_note, False)[2])
+
+def _draw_key(surface, note, active):
+    x = (note - START_NOTE) * KEY_WIDTH
+    rect = pygame.Rect(x, 0, KEY_WIDTH, KEY_HEIGHT)
+    fill, border, _ = _key_colors(note, active)
+    pygame.draw.rect(surface, fill, rect)
+    pygame.draw.rect(surface, border, rect, 1)
+    # Note name label on each key
+    surface.blit(_LABEL_SURFS[note], (x + 4, KEY_HEIGHT - 22))
+
+def _render_keyboard_background():
+    """Pre-render the idle keyboard; only active keys are redrawn per frame"""
+    bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+    bg.fill((20, 20, 20))  # dark background for contrast
+    for note in range(START_NOTE, START_NOTE + KEYS):
+        _draw_key(bg, note, False)
+    return bg
+
+_KEYBOARD_BG = _render_keyboard_background()
+
+# HUD panels keyed by (bpm, status_text), oldest evicted first
+_HUD_CACHE = OrderedDict()
+_HUD_CACHE_SIZE = 32
+
+def _render_hud(bpm, status_text):
     legend_lines = [
         f"BPM: {bpm} | {status_text}",
         "Controls:",
@@ -257,7 +381,28 @@ def draw_keyboard(bpm, status_text):
         text = font.render(line, True, (255, 255, 255))
         panel.blit(text, (pad, y))
         y += text.get_height() + pad
-    screen.blit(panel, (8, 8))
+    return panel
+
+def _hud_panel(bpm, status_text):
+    key = (bpm, status_text)
+    panel = _HUD_CACHE.get(key)
+    if panel is None:
+        panel = _render_hud(bpm, status_text)
+        _HUD_CACHE[key] = panel
+        if len(_HUD_CACHE) > _HUD_CACHE_SIZE:
+            _HUD_CACHE.popitem(last=False)
+    else:
+        _HUD_CACHE.move_to_end(key)
+    return panel
+
+def draw_keyboard(bpm, status_text):
+    # Static keys, then highlight only the active ones
+    screen.blit(_KEYBOARD_BG, (0, 0))
+    for i in np.flatnonzero(_ACTIVE[START_NOTE:START_NOTE + KEYS]):
+        _draw_key(screen, START_NOTE + int(i), True)
+
+    # HUD / Legend panel
+    screen.blit(_hud_panel(bpm, status_text), (8, 8))
 
 def play_note(note):
     if note in KEY_SOUNDS:
@@ -287,6 +432,15 @@ REST_MAP = {
     'rrrr': 0.25, # sixteenth rest
 }
 
+# Precompiled parser patterns
+_CHORD_SPLIT_RE = re.compile(r'[,\s]+')
+_TRIOLE_RE = re.compile(r'^\s*triole\s*:\s*([whqes])\s*$', re.IGNORECASE)
+_TRACK_LABEL_RE = re.compile(r'^([LR]):\s*(.*)$', re.IGNORECASE)
+# Sequence line tokens: a bracketed chord up to its ']' (or the next '[' / end of line),
+# otherwise a run of non-delimiter characters, which a stray ']' terminates
+_TOKEN_RE = re.compile(r'\[[^\[\]]*\]?|[^,;| \t\[\]]*\]|[^,;| \t\[\]]+')
+
+@lru_cache(maxsize=512)
 def note_name_to_midi(token):
     # Accept 'R' or 'rest' for rest
     t = token.strip()
@@ -321,6 +475,7 @@ def note_name_to_midi(token):
         raise ValueError(f"MIDI note out of range: {t} -> {midi}")
     return midi
 
+@lru_cache(maxsize=512)
 def parse_duration(token):
     t = token.strip().lower()
     if t in DURATION_MAP:
@@ -337,7 +492,7 @@ def parse_note_group(note_tok):
     # Bracketed chord with individual durations: [Ab3:h C4:h G4:e]
     if note_tok.startswith('[') and note_tok.endswith(']'):
         inner = note_tok[1:-1]
-        items = re.split(r'[,\s]+', inner.strip())
+        items = _CHORD_SPLIT_RE.split(inner.strip())
         notes_with_dur = []
         for it in items:
             if not it:
@@ -375,31 +530,8 @@ def parse_sequence_line(text):
     # Parse a single track line into [(note_or_chord, beats), ...] and control tokens
     if not text.strip():
         return []
-    # Split carefully to preserve bracketed chords
-    parts = []
-    current = ''
-    in_bracket = False
-    for char in text:
-        if char == '[':
-            if current.strip():
-                parts.append(current.strip())
-                current = ''
-            in_bracket = True
-            current += char
-        elif char == ']':
-            in_bracket = False
-            current += char
-            if current.strip():
-                parts.append(current.strip())
-                current = ''
-        elif char in ',;| \t' and not in_bracket:
-            if current.strip():
-                parts.append(current.strip())
-            current = ''
-        else:
-            current += char
-    if current.strip():
-        parts.append(current.strip())
+    # Split on delimiters, keeping bracketed chords (even unclosed ones) whole
+    parts = [tok.strip() for tok in _TOKEN_RE.findall(text)]
 
     seq = []
     for part in parts:
@@ -407,7 +539,7 @@ def parse_sequence_line(text):
             continue
 
         # Triolé control: Triole:<w|h|q|e|s>
-        m = re.match(r'^\s*triole\s*:\s*([whqes])\s*$', part, flags=re.IGNORECASE)
+        m = _TRIOLE_RE.match(part)
         if m:
             unit = m.group(1).lower()
             seq.append(('__TRIOLE__', DURATION_MAP[unit]))
@@ -448,7 +580,7 @@ def parse_sequence_file_text(text):
         line = raw.strip()
         if not line or line.startswith('#'):
             continue
-        m = re.match(r'^([LR]):\s*(.*)$', line, flags=re.IGNORECASE)
+        m = _TRACK_LABEL_RE.match(line)
         if m:
             any_labeled = True
             label = m.group(1).upper()
@@ -586,151 +718,162 @@ BPM = 120
 SEQUENCE = load_sequence_from_file("sequence.txt") # Try default on startup
 is_playing = False
 
-# Per-track timing state
-track_state = {}  # label -> dict(idx, current, next_on_ms, off_ms, finished, trip_scale, trip_remaining)
+# Per-track timing state, struct-of-arrays indexed by track slot
+_TRACK_LABELS = []   # slot -> label ('L', 'R')
+_TRACK_SEQS = []     # slot -> event list
+_CURRENT = []        # slot -> None | 'rest' | int | [int,...]
+_IDX = np.zeros(0, dtype=np.int64)
+_LEN = np.zeros(0, dtype=np.int64)
+_NEXT_ON_MS = np.zeros(0, dtype=np.int64)
+_OFF_MS = np.zeros(0, dtype=np.int64)
+_FINISHED = np.zeros(0, dtype=bool)
+_TRIP_REMAIN = np.zeros(0, dtype=np.int64)
+_TRIP_SCALE = np.ones(0, dtype=np.float64)
+
+def _reset_track_state(sequence, now=0):
+    global _TRACK_LABELS, _TRACK_SEQS, _CURRENT, _IDX, _LEN, _NEXT_ON_MS, _OFF_MS
+    global _FINISHED, _TRIP_REMAIN, _TRIP_SCALE
+    n = len(sequence)
+    _TRACK_LABELS = list(sequence.keys())
+    _TRACK_SEQS = list(sequence.values())
+    _CURRENT = [None] * n
+    _IDX = np.full(n, -1, dtype=np.int64)
+    _LEN = np.array([len(seq) for seq in _TRACK_SEQS], dtype=np.int64)
+    _NEXT_ON_MS = np.full(n, now, dtype=np.int64)  # schedule immediately
+    _OFF_MS = np.zeros(n, dtype=np.int64)
+    _FINISHED = np.zeros(n, dtype=bool)
+    _TRIP_REMAIN = np.zeros(n, dtype=np.int64)
+    _TRIP_SCALE = np.ones(n, dtype=np.float64)
 
 def sequencer_start():
-    global is_playing, track_state
+    global is_playing
     if not any(SEQUENCE.values()):
         print("No sequence loaded. Press R to reload or create sequence.txt.")
         return
+    # Stop anything left over from a previous run before resetting state
+    for t in range(len(_TRACK_LABELS)):
+        _stop_current_for_track(t)
     is_playing = True
-    now = pygame.time.get_ticks()
-    track_state = {}
-    for label, seq in SEQUENCE.items():
-        track_state[label] = {
-            'idx': -1,
-            'current': None,        # None | 'rest' | int | [int,...]
-            'next_on_ms': now,      # schedule immediately
-            'off_ms': 0,
-            'finished': False,
-            'len': len(seq),
-            'trip_scale': 1.0,
-            'trip_remaining': 0,
-        }
-    PLAYING_SEQ_NOTES.clear()
+    _reset_track_state(SEQUENCE, pygame.time.get_ticks())
     print("Playback started.")
 
 def sequencer_stop():
-    global is_playing, track_state
+    global is_playing
     # Stop any notes still sounding
-    for n in list(PLAYING_SEQ_NOTES):
-        stop_note(n)
-    PLAYING_SEQ_NOTES.clear()
+    for t in range(len(_TRACK_LABELS)):
+        _stop_current_for_track(t)
     is_playing = False
-    track_state = {}
+    _reset_track_state({})
     print("Playback stopped.")
 
-def _stop_current_for_track(state):
-    cur = state['current']
+def _stop_current_for_track(t):
+    cur = _CURRENT[t]
     if cur not in (None, 'rest'):
         if isinstance(cur, list):
             for n in cur:
-                PLAYING_SEQ_NOTES.discard(n)
+                _release(n)
                 stop_note(n)
         else:
-            PLAYING_SEQ_NOTES.discard(cur)
+            _release(cur)
             stop_note(cur)
-    state['current'] = None
+    _CURRENT[t] = None
+
+def _consume_triole_slot(t):
+    if _TRIP_REMAIN[t] > 0:
+        _TRIP_REMAIN[t] -= 1
+        if _TRIP_REMAIN[t] == 0:
+            _TRIP_SCALE[t] = 1.0
+
+def _advance_track(t, now):
+    seq = _TRACK_SEQS[t]
+
+    # Turn off if time passed (including rests)
+    if _CURRENT[t] is not None and now >= _OFF_MS[t]:
+        if _CURRENT[t] != 'rest':
+            _stop_current_for_track(t)
+        else:
+            _CURRENT[t] = None  # Clear rest so next event can start
+
+    # Start next if ready
+    if _CURRENT[t] is None and now >= _NEXT_ON_MS[t]:
+        while True:
+            _IDX[t] += 1
+            idx = int(_IDX[t])
+            if idx >= _LEN[t]:
+                _FINISHED[t] = True
+                break
+            ev = seq[idx]
+            if isinstance(ev, tuple) and len(ev) == 2 and ev[0] == '__TRIOLE__':
+                base_unit = ev[1]
+                scale, count = _compute_triole_scale(seq, idx, base_unit)
+                _TRIP_SCALE[t] = scale
+                _TRIP_REMAIN[t] = count
+                continue
+
+            note, beats = ev
+            trip_scale = float(_TRIP_SCALE[t]) if _TRIP_REMAIN[t] > 0 else None
+
+            # Handle variable-duration chords (beats is None, note is [(note, dur), ...])
+            if beats is None and isinstance(note, list) and note and isinstance(note[0], tuple):
+                # Variable-duration chord: scale each note's duration if triplet active
+                eff_notes = []
+                for n, d in note:
+                    d_eff = d * trip_scale if trip_scale is not None else d
+                    eff_notes.append((n, d_eff))
+                max_dur = max(d for _, d in eff_notes)
+                # Start all notes
+                for n, _ in eff_notes:
+                    _hold(n)
+                    play_note(n)
+                _CURRENT[t] = [n for n, _ in eff_notes]
+                dur_ms = beats_to_ms(max_dur, BPM)
+                _OFF_MS[t] = now + dur_ms
+                _NEXT_ON_MS[t] = now + dur_ms
+                # Consume triplet slot if active
+                _consume_triole_slot(t)
+                break
+
+            # Handle rests correctly
+            if note == 'rest':
+                # Schedule the next note after the rest duration
+                dur_ms = beats_to_ms(beats, BPM)
+                _CURRENT[t] = 'rest'
+                _NEXT_ON_MS[t] = now + dur_ms
+                _OFF_MS[t] = now + dur_ms
+                break  # Skip to the next iteration to check if we can play the next note
+
+            # Normal note/chord
+            eff_beats = beats if beats is not None else 0  # Ensure eff_beats is not None
+            if isinstance(eff_beats, (int, float)) and trip_scale is not None:
+                eff_beats = eff_beats * trip_scale
+            dur_ms = beats_to_ms(eff_beats, BPM)
+            if isinstance(note, list):
+                for n in note:
+                    _hold(n)
+                    play_note(n)
+            else:
+                _hold(note)
+                play_note(note)
+            _CURRENT[t] = note
+            _OFF_MS[t] = now + dur_ms
+            _NEXT_ON_MS[t] = now + dur_ms
+
+            # Consume one of the triolé slots if active
+            _consume_triole_slot(t)
+            break  # scheduled one event this tick
 
 def sequencer_update():
     if not is_playing:
         return
     now = pygame.time.get_ticks()
-    any_active = False
-
-    for label, seq in SEQUENCE.items():
-        st = track_state.get(label)
-        if not st or st['finished']:
-            continue
 
-        # Turn off if time passed (including rests)
-        if st['current'] is not None and now >= st['off_ms']:
-            if st['current'] != 'rest':
-                _stop_current_for_track(st)
-            else:
-                st['current'] = None  # Clear rest so next event can start
-
-        # Start next if ready
-        if st['current'] is None and now >= st['next_on_ms']:
-            while True:
-                st['idx'] += 1
-                if st['idx'] >= st['len']:
-                    st['finished'] = True
-                    break
-                ev = seq[st['idx']]
-                if isinstance(ev, tuple) and len(ev) == 2 and ev[0] == '__TRIOLE__':
-                    base_unit = ev[1]
-                    scale, count = _compute_triole_scale(seq, st['idx'], base_unit)
-                    st['trip_scale'] = scale
-                    st['trip_remaining'] = count
-                    continue
-
-                note, beats = ev
-
-                # Handle variable-duration chords (beats is None, note is [(note, dur), ...])
-                if beats is None and isinstance(note, list) and note and isinstance(note[0], tuple):
-                    # Variable-duration chord: scale each note's duration if triplet active
-                    eff_notes = []
-                    for n, d in note:
-                        d_eff = d * st['trip_scale'] if st['trip_remaining'] > 0 else d
-                        eff_notes.append((n, d_eff))
-                    max_dur = max(d for _, d in eff_notes)
-                    # Start all notes
-                    for n, _ in eff_notes:
-                        PLAYING_SEQ_NOTES.add(n)
-                        play_note(n)
-                    st['current'] = [n for n, _ in eff_notes]
-                    dur_ms = beats_to_ms(max_dur, BPM)
-                    st['off_ms'] = now + dur_ms
-                    st['next_on_ms'] = now + dur_ms
-                    # Consume triplet slot if active
-                    if st['trip_remaining'] > 0:
-                        st['trip_remaining'] -= 1
-                        if st['trip_remaining'] == 0:
-                            st['trip_scale'] = 1.0
-                    break
-                
-                # Handle rests correctly
-                if note == 'rest':
-                    # Schedule the next note after the rest duration
-                    dur_ms = beats_to_ms(beats, BPM)
-                    st['current'] = 'rest'
-                    st['next_on_ms'] = now + dur_ms
-                    st['off_ms'] = now + dur_ms
-                    break  # Skip to the next iteration to check if we can play the next note
-
-                # Normal note/chord
-                eff_beats = beats if beats is not None else 0  # Ensure eff_beats is not None
-                if isinstance(eff_beats, (int, float)) and st['trip_remaining'] > 0:
-                    eff_beats = eff_beats * st['trip_scale']
-                dur_ms = beats_to_ms(eff_beats, BPM)
-                if note != 'rest':
-                    if isinstance(note, list):
-                        for n in note:
-                            PLAYING_SEQ_NOTES.add(n)
-                            play_note(n)
-                    else:
-                        PLAYING_SEQ_NOTES.add(note)
-                        play_note(note)
-                    st['current'] = note
-                else:
-                    st['current'] = 'rest'
-                st['off_ms'] = now + dur_ms
-                st['next_on_ms'] = now + dur_ms
-
-                # Consume one of the triolé slots if active
-                if st['trip_remaining'] > 0:
-                    st['trip_remaining'] -= 1
-                    if st['trip_remaining'] == 0:
-                        st['trip_scale'] = 1.0
-                break  # scheduled one event this tick
-
-        if not st['finished']:
-            any_active = True
+    # Only tracks with an off or on time reached need any Python-level work
+    due = ~_FINISHED & (now >= np.minimum(_OFF_MS, _NEXT_ON_MS))
+    for t in np.flatnonzero(due):
+        _advance_track(int(t), now)
 
     # Stop only when ALL tracks are finished
-    if not any_active:
+    if _FINISHED.all():
         sequencer_stop()
 
 # --- Events / Main loop ---
@@ -743,19 +886,23 @@ def mouse_down_to_note(pos):
     return None
 
 def track_status_string():
-    if not is_playing or not track_state:
+    if not is_playing or not _TRACK_LABELS:
         return "Ready"
     parts = []
-    for label, st in sorted(track_state.items()):
-        total = st['len']
-        cur = min(st['idx'] + 1, total)
+    for label, t in sorted((label, t) for t, label in enumerate(_TRACK_LABELS)):
+        total = int(_LEN[t])
+        cur = min(int(_IDX[t]) + 1, total)
         parts.append(f"{label}:{cur}/{total}")
     return "Playing " + " ".join(parts)
 
 # Main loop
+_prev_frame_state = None  # (bpm, status, active keys) last drawn; skip redraw while unchanged
 while True:
     status = track_status_string()
+    dirty = False
     for event in pygame.event.get():
+        if event.type != pygame.MOUSEMOTION:
+            dirty = True  # input or window events (expose, resize) may need a redraw
         if event.type == pygame.QUIT:
             # Clean up MIDI backends
             try:
@@ -787,17 +934,23 @@ while True:
         elif event.type == pygame.MOUSEBUTTONDOWN:
             note = mouse_down_to_note(event.pos)
             if note is not None:
-                KEYS_PRESSED.add(note)
+                if note not in KEYS_PRESSED:
+                    KEYS_PRESSED.add(note)
+                    _hold(note)
                 play_note(note)
         elif event.type == pygame.MOUSEBUTTONUP:
             note = mouse_down_to_note(event.pos)
             if note is not None and note in KEYS_PRESSED:
                 KEYS_PRESSED.remove(note)
+                _release(note)
                 stop_note(note)
 
     sequencer_update()
 
-    screen.fill(BLACK)
-    draw_keyboard(BPM, status)
-    pygame.display.flip()
+    frame_state = (BPM, status, _ACTIVE.tobytes())
+    if dirty or frame_state != _prev_frame_state:
+        screen.fill(BLACK)
+        draw_keyboard(BPM, status)
+        pygame.display.flip()
+        _prev_frame_state = frame_state
     clock.tick(60)
\ No newline at end of file